@@ -21,7 +21,9 @@ fi
 # Package Lambda function
 echo "📦 Packaging Lambda function..."
 cd lambda
-pip install -r requirements.txt -t .
+# awscrt and orjson ship native wheels, so fetch the ones matching the Lambda runtime
+pip install -r requirements.txt -t . \
+    --platform manylinux2014_aarch64 --python-version 3.12 --only-binary=:all:
 zip -r ../voice_processor.zip . -x "*.pyc" "__pycache__/*"
 cd ..
 
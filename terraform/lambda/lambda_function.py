@@ -1,20 +1,136 @@
-import json
-import boto3
+import orjson
 import base64
+import binascii
+import hashlib
 import uuid
 import os
+import re
+import io
+import wave
+import asyncio
 import logging
 import time
-from typing import Dict, Any, Optional
+import functools
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+try:
+    from amazon_transcribe.client import TranscribeStreamingClient
+    from amazon_transcribe.handlers import TranscriptResultStreamHandler
+except ImportError:  # streaming SDK not bundled; fall back to batch jobs
+    TranscribeStreamingClient = None
+    TranscriptResultStreamHandler = object
+
+try:
+    import vosk
+except ImportError:  # no local recognizer bundled; use AWS Transcribe
+    vosk = None
 
 # Configure logging
 log_level = os.environ.get('LOG_LEVEL', 'INFO')
 logger = logging.getLogger()
 logger.setLevel(getattr(logging, log_level))
 
-# Initialize AWS clients
-s3_client = boto3.client('s3')
-transcribe_client = boto3.client('transcribe')
+# AWS clients are created on first use so cache hits and local recognition
+# never pay for importing boto3
+s3_client = None
+transcribe_client = None
+streaming_client = None
+
+def client_config(**overrides):
+    """
+    Build a botocore Config with short timeouts so a stalled call fails fast
+    """
+    from botocore.config import Config
+    return Config(
+        retries={'max_attempts': 2, 'mode': 'adaptive'},
+        connect_timeout=2,
+        read_timeout=5
+    ).merge(Config(**overrides))
+
+def get_s3_client():
+    """
+    Return the shared S3 client, creating it on first use
+    """
+    global s3_client
+    if s3_client is None:
+        import boto3
+        s3_client = boto3.client('s3', config=client_config(
+            tcp_keepalive=True,
+            max_pool_connections=20,
+            s3={'use_accelerate_endpoint': False}
+        ))
+    return s3_client
+
+def get_transcribe_client():
+    """
+    Return the shared Transcribe client, creating it on first use
+    """
+    global transcribe_client
+    if transcribe_client is None:
+        import boto3
+        # Polling is its own retry loop, so keep boto3 from retrying on top of it
+        transcribe_client = boto3.client('transcribe', config=client_config(
+            retries={'max_attempts': 1, 'mode': 'standard'}
+        ))
+    return transcribe_client
+
+def get_streaming_client():
+    """
+    Return the shared Transcribe streaming client, creating it on first use
+    """
+    global streaming_client
+    if streaming_client is None:
+        streaming_client = TranscribeStreamingClient(
+            region=os.environ.get('AWS_REGION', 'us-east-1')
+        )
+    return streaming_client
+
+# SnapStart and provisioned concurrency initialize ahead of traffic, so build
+# the clients now and let them be captured in the initialized environment
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') in ('snap-start', 'provisioned-concurrency'):
+    get_s3_client()
+    get_transcribe_client()
+    if TranscribeStreamingClient:
+        get_streaming_client()
+
+# Event loop is reused across warm invocations
+event_loop = asyncio.new_event_loop()
+
+# Optional local keyword recognizer (model shipped in a Lambda layer)
+vosk_model_path = os.environ.get('VOSK_MODEL_PATH')
+vosk_model = vosk.Model(vosk_model_path) if vosk and vosk_model_path else None
+
+# Background pool for cleanup calls that should not delay the response
+cleanup_executor = ThreadPoolExecutor(max_workers=4)
+
+# Finished transcription jobs are deleted in batches across invocations
+pending_job_deletions = deque()
+JOB_DELETE_BATCH_SIZE = 10
+
+# Commands for recently seen audio, keyed by content hash (LRU order)
+audio_command_cache = OrderedDict()
+AUDIO_CACHE_SIZE = 128
+
+# Batch transcription polling limits (the Lambda itself times out at 30 s)
+BATCH_MAX_WAIT = 25  # seconds
+RESPONSE_MARGIN = 6  # seconds kept back for a final poll and the response
+
+# Streaming transcription settings
+STREAM_CHUNK_SIZE = 8192  # bytes per audio event
+STREAM_TIMEOUT = 10  # seconds to wait for a final transcript
+STREAM_MIN_SAMPLE_RATE = 8000  # Hz, PCM range accepted by streaming
+STREAM_MAX_SAMPLE_RATE = 48000
+
+# Headers shared by every API response (treat as read-only)
+RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type'
+}
 
 # Command mapping configuration
 COMMAND_MAPPINGS = {
@@ -57,29 +173,74 @@ COMMAND_MAPPINGS = {
     'slowly': {'modifier': 'speed', 'value': 'slow'},
 }
 
+# Lookup tables precompiled from COMMAND_MAPPINGS (values frozen as item tuples)
+EXACT_MATCHES = {
+    phrase: tuple(cmd.items()) for phrase, cmd in COMMAND_MAPPINGS.items()
+}
+SPEED_WORDS = {
+    word: cmd['value'] for word, cmd in COMMAND_MAPPINGS.items()
+    if cmd.get('modifier') == 'speed'
+}
+COMMAND_PHRASES = tuple(
+    (frozenset(phrase.split()), len(phrase.split()), tuple(cmd.items()))
+    for phrase, cmd in COMMAND_MAPPINGS.items() if 'modifier' not in cmd
+)
+COMMAND_CACHE_SIZE = 256  # repeated utterances are served from the LRU cache
+
+# Anything other than letters, digits, apostrophes and spaces (e.g. "stop.")
+TRANSCRIPT_PUNCTUATION = re.compile(r"[^a-z0-9' ]+")
+
+# Constrain local recognition to the command vocabulary
+VOSK_GRAMMAR = orjson.dumps(list(COMMAND_MAPPINGS) + ['[unk]']).decode()
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Main Lambda handler for processing voice commands
     """
     try:
-        logger.info(f"Received event: {json.dumps(event, default=str)}")
+        # Log only the event shape; the body carries the audio payload
+        logger.info("Received event keys=%s body_len=%d",
+                    list(event.keys()), len(event.get('body') or ''))
         
         # Parse the request
         if 'body' not in event:
             return create_error_response(400, "Missing request body")
         
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
-        logger.debug(f"Parsed body: {json.dumps(body, default=str)}")
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
         
-        # Extract audio data
-        if 'audio' not in body:
-            return create_error_response(400, "Missing audio data")
+        if headers.get('content-type', '').startswith('audio/'):
+            # Raw audio body (API Gateway binary media type)
+            raw_body = event['body'] or ''
+            if event.get('isBase64Encoded'):
+                audio_bytes = base64.b64decode(raw_body)
+            else:
+                audio_bytes = raw_body.encode('latin-1') if isinstance(raw_body, str) else raw_body
+            rover_ip = (event.get('queryStringParameters') or {}).get('rover_ip')
+        else:
+            # JSON body with base64 encoded audio
+            body = orjson.loads(event['body']) if isinstance(event['body'], str) else event['body']
+            # Log the body shape only; the audio field can be hundreds of KB
+            logger.debug("Parsed body keys=%s audio_len=%d",
+                         list(body), len(body.get('audio') or ''))
+            
+            if 'audio' not in body:
+                return create_error_response(400, "Missing audio data")
+            
+            audio_bytes = base64.b64decode(body['audio'])
+            rover_ip = body.get('rover_ip')
         
-        audio_data = body['audio']
-        rover_ip = body.get('rover_ip')
+        if not audio_bytes:
+            return create_error_response(400, "Missing audio data")
+        logger.debug("Decoded audio data: %d bytes", len(audio_bytes))
         
         # Process the audio and get command
-        command = process_voice_command(audio_data, rover_ip)
+        # Leave time to answer before Lambda kills the invocation
+        deadline = None
+        if context is not None:
+            deadline = (time.monotonic() + context.get_remaining_time_in_millis() / 1000
+                        - RESPONSE_MARGIN)
+        
+        command = process_voice_command(audio_bytes, rover_ip, deadline)
         
         if command:
             logger.info(f"Successfully processed command: {command}")
@@ -88,88 +249,243 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             logger.warning("No valid command found in audio")
             return create_error_response(400, "No valid command recognized")
             
+    except binascii.Error as e:
+        logger.warning(f"Invalid base64 audio data: {e}")
+        return create_error_response(400, "Invalid audio data")
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}", exc_info=True)
         return create_error_response(500, f"Internal server error: {str(e)}")
 
-def process_voice_command(audio_data: str, rover_ip: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def process_voice_command(audio_bytes: bytes, rover_ip: Optional[str] = None,
+                          deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
     """
-    Process base64 encoded audio data and return rover command
+    Process decoded audio data and return rover command
     """
     try:
-        # Decode audio data
-        audio_bytes = base64.b64decode(audio_data)
-        logger.debug(f"Decoded audio data: {len(audio_bytes)} bytes")
+        # Identical audio (e.g. a client retry) skips transcription entirely
+        audio_hash = hashlib.blake2b(audio_bytes, digest_size=16).digest()
+        command = get_cached_audio_command(audio_hash)
+        
+        if command:
+            logger.info(f"Audio cache hit: {command}")
+        else:
+            command = transcribe_and_parse(audio_bytes, deadline)
+            if not command:
+                return None
+            cache_audio_command(audio_hash, command)
+        
+        # Add rover IP if provided
+        if rover_ip:
+            command['rover_ip'] = rover_ip
+        
+        return command
         
-        # Upload to S3
+    except Exception as e:
+        logger.error(f"Error processing voice command: {str(e)}", exc_info=True)
+        return None
+
+def transcribe_and_parse(audio_bytes: bytes, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Transcribe audio and parse the transcript into a rover command
+    """
+    # Prefer local recognition, then streaming, then a batch job for non-PCM audio
+    pcm_audio = extract_pcm_audio(audio_bytes) if vosk_model or TranscribeStreamingClient else None
+    
+    if pcm_audio and vosk_model:
+        transcript = transcribe_audio_local(*pcm_audio)
+    elif pcm_audio:
+        transcript = transcribe_audio_stream(*pcm_audio)
+    else:
         bucket_name = os.environ['AUDIO_BUCKET']
         audio_key = f"audio/{uuid.uuid4()}.wav"
         
-        s3_client.put_object(
+        get_s3_client().put_object(
             Bucket=bucket_name,
             Key=audio_key,
             Body=audio_bytes,
-            ContentType='audio/wav'
+            ContentType='audio/wav',
+            ContentMD5=base64.b64encode(hashlib.md5(audio_bytes).digest()).decode()
         )
         logger.debug(f"Uploaded audio to S3: s3://{bucket_name}/{audio_key}")
         
-        # Start transcription
-        transcript = transcribe_audio(bucket_name, audio_key)
+        # Uploaded audio is reaped by the bucket lifecycle rule
+        transcript = transcribe_audio(bucket_name, audio_key, deadline)
+    
+    if not transcript:
+        logger.warning("No transcript generated")
+        return None
+    
+    logger.info(f"Transcript: {transcript}")
+    
+    # Parse command from transcript
+    return parse_command_from_text(transcript)
+
+def get_cached_audio_command(audio_hash: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Return a fresh copy of the cached command for this audio, if any
+    """
+    command_items = audio_command_cache.get(audio_hash)
+    if command_items is None:
+        return None
+    
+    audio_command_cache.move_to_end(audio_hash)
+    return dict(command_items)
+
+def cache_audio_command(audio_hash: bytes, command: Dict[str, Any]) -> None:
+    """
+    Remember the command for this audio, evicting the least recently used
+    """
+    audio_command_cache[audio_hash] = tuple(command.items())
+    audio_command_cache.move_to_end(audio_hash)
+    
+    if len(audio_command_cache) > AUDIO_CACHE_SIZE:
+        audio_command_cache.popitem(last=False)
+
+def normalize_transcript(text: str) -> str:
+    """
+    Lowercase a transcript and strip punctuation and extra whitespace
+    """
+    return ' '.join(TRANSCRIPT_PUNCTUATION.sub(' ', text.lower()).split())
+
+def extract_pcm_audio(audio_bytes: bytes) -> Optional[tuple]:
+    """
+    Return (pcm_bytes, sample_rate) for 16-bit mono PCM WAV audio at a sample
+    rate Transcribe streaming accepts, else None
+    """
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                return None
+            if not STREAM_MIN_SAMPLE_RATE <= wav.getframerate() <= STREAM_MAX_SAMPLE_RATE:
+                return None
+            return wav.readframes(wav.getnframes()), wav.getframerate()
+    except (wave.Error, EOFError):
+        return None
+
+class FinalTranscriptHandler(TranscriptResultStreamHandler):
+    """
+    Capture the first non-partial transcript from a streaming session
+    """
+    def __init__(self, transcript_result_stream):
+        super().__init__(transcript_result_stream)
+        self.transcript = None
+        self.done = asyncio.Event()
+    
+    async def handle_transcript_event(self, transcript_event):
+        for result in transcript_event.transcript.results:
+            if not result.is_partial and result.alternatives:
+                self.transcript = result.alternatives[0].transcript
+                self.done.set()
+                return
+
+async def stream_transcription(pcm_bytes: bytes, sample_rate: int) -> Optional[str]:
+    """
+    Push PCM audio through a Transcribe streaming session
+    """
+    stream = await get_streaming_client().start_stream_transcription(
+        language_code='en-US',
+        media_sample_rate_hz=sample_rate,
+        media_encoding='pcm'
+    )
+    handler = FinalTranscriptHandler(stream.output_stream)
+    handler_task = asyncio.ensure_future(handler.handle_events())
+    
+    for i in range(0, len(pcm_bytes), STREAM_CHUNK_SIZE):
+        await stream.input_stream.send_audio_event(
+            audio_chunk=pcm_bytes[i:i + STREAM_CHUNK_SIZE]
+        )
+    await stream.input_stream.end_stream()
+    
+    # Stop as soon as the first final result arrives
+    done_task = asyncio.ensure_future(handler.done.wait())
+    finished, _ = await asyncio.wait(
+        {handler_task, done_task},
+        timeout=STREAM_TIMEOUT,
+        return_when=asyncio.FIRST_COMPLETED
+    )
+    if not finished:
+        logger.warning(f"Streaming transcription timed out after {STREAM_TIMEOUT} seconds")
+    for task in (handler_task, done_task):
+        task.cancel()
+    
+    # Surface stream errors (access denied, bad sample rate, throttling)
+    if handler_task.done() and not handler_task.cancelled():
+        handler_task.result()
+    
+    return handler.transcript
+
+def transcribe_audio_local(pcm_bytes: bytes, sample_rate: int) -> Optional[str]:
+    """
+    Transcribe audio locally with Vosk, limited to the command vocabulary
+    """
+    try:
+        recognizer = vosk.KaldiRecognizer(vosk_model, sample_rate, VOSK_GRAMMAR)
+        recognizer.AcceptWaveform(pcm_bytes)
+        result = orjson.loads(recognizer.FinalResult())
         
-        if not transcript:
-            logger.warning("No transcript generated")
+        transcript_text = ' '.join(w for w in result.get('text', '').split() if w != '[unk]')
+        if not transcript_text:
+            logger.warning("Local recognition found no command words")
             return None
         
-        logger.info(f"Transcript: {transcript}")
+        logger.info(f"Transcription completed: {transcript_text}")
+        return normalize_transcript(transcript_text)
         
-        # Parse command from transcript
-        command = parse_command_from_text(transcript)
+    except Exception as e:
+        logger.error(f"Error during local transcription: {str(e)}", exc_info=True)
+        return None
+
+def transcribe_audio_stream(pcm_bytes: bytes, sample_rate: int) -> Optional[str]:
+    """
+    Transcribe audio using AWS Transcribe streaming
+    """
+    try:
+        transcript_text = event_loop.run_until_complete(
+            stream_transcription(pcm_bytes, sample_rate)
+        )
         
-        # Add rover IP if provided
-        if command and rover_ip:
-            command['rover_ip'] = rover_ip
-            
-        # Cleanup S3 object
-        try:
-            s3_client.delete_object(Bucket=bucket_name, Key=audio_key)
-            logger.debug(f"Cleaned up S3 object: {audio_key}")
-        except Exception as e:
-            logger.warning(f"Failed to cleanup S3 object: {e}")
+        if not transcript_text:
+            logger.warning("Streaming transcription returned no final result")
+            return None
         
-        return command
+        logger.info(f"Transcription completed: {transcript_text}")
+        return normalize_transcript(transcript_text)
         
     except Exception as e:
-        logger.error(f"Error processing voice command: {str(e)}", exc_info=True)
+        logger.error(f"Error during streaming transcription: {str(e)}", exc_info=True)
         return None
 
-def transcribe_audio(bucket_name: str, audio_key: str) -> Optional[str]:
+def transcribe_audio(bucket_name: str, audio_key: str,
+                     deadline: Optional[float] = None) -> Optional[str]:
     """
-    Transcribe audio using AWS Transcribe
+    Transcribe audio using an AWS Transcribe batch job, polling until the
+    time.monotonic() deadline (capped at BATCH_MAX_WAIT from job start)
     """
     job_name = f"rover-transcribe-{uuid.uuid4()}"
     job_uri = f"s3://{bucket_name}/{audio_key}"
+    job_started = False
     
     try:
         # Start transcription job
-        transcribe_client.start_transcription_job(
+        get_transcribe_client().start_transcription_job(
             TranscriptionJobName=job_name,
             Media={'MediaFileUri': job_uri},
             MediaFormat='wav',
             LanguageCode='en-US',
-            Settings={
-                'ShowSpeakerLabels': False,
-                'MaxSpeakerLabels': 1
-            }
+            OutputBucketName=bucket_name,
+            OutputKey=f"audio/{job_name}.json"
         )
+        job_started = True
         logger.debug(f"Started transcription job: {job_name}")
         
-        # Wait for completion (with timeout)
-        max_wait_time = 30  # seconds
-        wait_interval = 1
-        elapsed_time = 0
+        # Wait for completion (with timeout), backing off between polls
+        poll_deadline = time.monotonic() + BATCH_MAX_WAIT
+        if deadline is not None:
+            poll_deadline = min(poll_deadline, deadline)
+        wait_interval = 0.1
         
-        while elapsed_time < max_wait_time:
-            response = transcribe_client.get_transcription_job(
+        while time.monotonic() < poll_deadline:
+            response = get_transcribe_client().get_transcription_job(
                 TranscriptionJobName=job_name
             )
             
@@ -179,93 +495,125 @@ def transcribe_audio(bucket_name: str, audio_key: str) -> Optional[str]:
             if status == 'COMPLETED':
                 # Get transcript
                 transcript_uri = response['TranscriptionJob']['Transcript']['TranscriptFileUri']
-                transcript_response = boto3.client('s3').get_object(
-                    Bucket=transcript_uri.split('/')[2],
-                    Key='/'.join(transcript_uri.split('/')[3:])
+                transcript_bucket, transcript_key = parse_s3_uri(transcript_uri)
+                transcript_response = get_s3_client().get_object(
+                    Bucket=transcript_bucket,
+                    Key=transcript_key
                 )
                 
-                transcript_data = json.loads(transcript_response['Body'].read())
+                transcript_data = orjson.loads(transcript_response['Body'].read())
                 transcript_text = transcript_data['results']['transcripts'][0]['transcript']
                 
                 logger.info(f"Transcription completed: {transcript_text}")
-                return transcript_text.lower().strip()
+                return normalize_transcript(transcript_text)
                 
             elif status == 'FAILED':
                 logger.error("Transcription job failed")
-                break
+                return None
                 
-            time.sleep(wait_interval)
-            elapsed_time += wait_interval
+            remaining = poll_deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(wait_interval, remaining))
+            wait_interval = min(wait_interval * 1.5, 2.0)
         
-        logger.warning(f"Transcription job timed out after {max_wait_time} seconds")
+        logger.warning(f"Transcription job {job_name} did not finish before the deadline")
         return None
         
     except Exception as e:
         logger.error(f"Error during transcription: {str(e)}", exc_info=True)
         return None
     finally:
-        # Cleanup transcription job
+        # Cleanup transcription job later, batched with other finished jobs
+        if job_started:
+            queue_job_deletion(job_name)
+
+def queue_job_deletion(job_name: str) -> None:
+    """
+    Queue a finished job and flush the queue once a batch has accumulated
+    """
+    pending_job_deletions.append(job_name)
+    
+    if len(pending_job_deletions) >= JOB_DELETE_BATCH_SIZE:
+        batch = [pending_job_deletions.popleft() for _ in range(len(pending_job_deletions))]
+        cleanup_executor.submit(delete_transcription_jobs, batch)
+
+def delete_transcription_jobs(job_names: List[str]) -> None:
+    """
+    Delete finished transcription jobs (runs on the cleanup executor)
+    """
+    for job_name in job_names:
         try:
-            transcribe_client.delete_transcription_job(TranscriptionJobName=job_name)
-        except:
-            pass
+            get_transcribe_client().delete_transcription_job(TranscriptionJobName=job_name)
+            logger.debug(f"Deleted transcription job: {job_name}")
+        except Exception as e:
+            logger.warning(f"Failed to delete transcription job {job_name}: {e}")
+
+def parse_s3_uri(uri: str) -> Tuple[str, str]:
+    """
+    Split an s3:// or path/virtual-hosted style S3 URL into (bucket, key)
+    """
+    parsed = urlparse(uri)
+    path = unquote(parsed.path).lstrip('/')
+    
+    if parsed.scheme == 's3':
+        return parsed.netloc, path
+    
+    # Path-style: https://s3.<region>.amazonaws.com/<bucket>/<key>
+    if parsed.netloc.startswith(('s3.', 's3-')):
+        bucket, _, key = path.partition('/')
+        return bucket, key
+    
+    # Virtual-hosted style: https://<bucket>.s3.<region>.amazonaws.com/<key>
+    return parsed.netloc.split('.s3', 1)[0], path
 
 def parse_command_from_text(text: str) -> Optional[Dict[str, Any]]:
     """
-    Parse rover command from transcribed text
+    Parse rover command from transcribed text (already stripped and lowercased)
     """
-    text = text.lower().strip()
     logger.debug(f"Parsing command from: '{text}'")
     
+    # Callers get a fresh dict so mutations never reach the cache
+    command_items = match_command(text)
+    return dict(command_items) if command_items else None
+
+@functools.lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def match_command(text: str) -> Optional[tuple]:
+    """
+    Match normalized text to a command, returned as an immutable item tuple
+    """
     # First, look for exact matches
-    if text in COMMAND_MAPPINGS:
-        command = COMMAND_MAPPINGS[text].copy()
+    if text in EXACT_MATCHES:
+        command = EXACT_MATCHES[text]
         logger.debug(f"Exact match found: {command}")
         return command
     
     # Look for partial matches and combinations
     words = text.split()
-    command = None
-    speed_modifier = None
+    words_set = set(words)
     
     # Check for speed modifiers
-    for word in words:
-        if word in COMMAND_MAPPINGS and COMMAND_MAPPINGS[word].get('modifier') == 'speed':
-            speed_modifier = COMMAND_MAPPINGS[word]['value']
-            break
+    speed_modifier = next((SPEED_WORDS[w] for w in words if w in SPEED_WORDS), None)
     
-    # Find the best command match
+    # Find the best command match, scored by the fraction of phrase words present
     best_match = None
     best_score = 0
     
-    for phrase, cmd in COMMAND_MAPPINGS.items():
-        if 'modifier' in cmd:
-            continue
-            
-        phrase_words = phrase.split()
-        score = 0
-        
-        # Check how many words match
-        for word in phrase_words:
-            if word in words:
-                score += 1
-        
-        # Normalize score by phrase length
-        normalized_score = score / len(phrase_words)
-        
-        if normalized_score > best_score and score > 0:
-            best_score = normalized_score
-            best_match = cmd.copy()
+    for phrase_words, phrase_len, cmd in COMMAND_PHRASES:
+        score = len(phrase_words & words_set)
+        if score and score / phrase_len > best_score:
+            best_score = score / phrase_len
+            best_match = cmd
     
     if best_match:
-        command = best_match
+        command = dict(best_match)
         
         # Apply speed modifier if found
         if speed_modifier:
             command['speed'] = speed_modifier
         
         logger.info(f"Command parsed: {command} (score: {best_score})")
-        return command
+        return tuple(command.items())
     
     logger.warning(f"No command found for text: '{text}'")
     return None
@@ -276,17 +624,12 @@ def create_success_response(command: Dict[str, Any]) -> Dict[str, Any]:
     """
     return {
         'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type'
-        },
-        'body': json.dumps({
+        'headers': RESPONSE_HEADERS,
+        'body': orjson.dumps({
             'success': True,
             'command': command,
             'timestamp': int(time.time())
-        })
+        }).decode()  # API Gateway expects a str body
     }
 
 def create_error_response(status_code: int, message: str) -> Dict[str, Any]:
@@ -295,15 +638,10 @@ def create_error_response(status_code: int, message: str) -> Dict[str, Any]:
     """
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type'
-        },
-        'body': json.dumps({
+        'headers': RESPONSE_HEADERS,
+        'body': orjson.dumps({
             'success': False,
             'error': message,
             'timestamp': int(time.time())
-        })
+        }).decode()  # API Gateway expects a str body
     }
\ No newline at end of file
@@ -31,6 +31,24 @@ variable "environment" {
   default     = "dev"
 }
 
+variable "lambda_memory_size" {
+  description = "Voice processor memory in MB (CPU scales with memory; tune with AWS Lambda Power Tuning)"
+  type        = number
+  default     = 1024
+}
+
+variable "lambda_layers" {
+  description = "Extra Lambda layer ARNs, e.g. a layer bundling vosk and its model"
+  type        = list(string)
+  default     = []
+}
+
+variable "vosk_model_path" {
+  description = "Path to a Vosk model inside the Lambda (e.g. /opt/vosk-model); empty uses AWS Transcribe"
+  type        = string
+  default     = ""
+}
+
 # S3 bucket for audio files
 resource "aws_s3_bucket" "audio_bucket" {
   bucket = "${var.project_name}-audio-${var.environment}-${random_id.bucket_suffix.hex}"
@@ -58,6 +76,24 @@ resource "aws_s3_bucket_lifecycle_configuration" "audio_bucket_lifecycle" {
       days = 7
     }
   }
+
+  # Uploaded clips are never deleted by the Lambda, expire them quickly
+  rule {
+    id     = "expire_uploaded_audio"
+    status = "Enabled"
+
+    filter {
+      prefix = "audio/"
+    }
+
+    expiration {
+      days = 1
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
 }
 
 # IAM role for Lambda
@@ -99,8 +135,7 @@ resource "aws_iam_role_policy" "lambda_policy" {
         Effect = "Allow"
         Action = [
           "s3:GetObject",
-          "s3:PutObject",
-          "s3:DeleteObject"
+          "s3:PutObject"
         ]
         Resource = "${aws_s3_bucket.audio_bucket.arn}/*"
       },
@@ -109,7 +144,9 @@ resource "aws_iam_role_policy" "lambda_policy" {
         Action = [
           "transcribe:StartTranscriptionJob",
           "transcribe:GetTranscriptionJob",
-          "transcribe:ListTranscriptionJobs"
+          "transcribe:ListTranscriptionJobs",
+          "transcribe:DeleteTranscriptionJob",
+          "transcribe:StartStreamTranscription"
         ]
         Resource = "*"
       }
@@ -130,14 +167,24 @@ resource "aws_lambda_function" "voice_processor" {
   role            = aws_iam_role.lambda_role.arn
   handler         = "lambda_function.lambda_handler"
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
-  runtime         = "python3.11"
+  runtime         = "python3.12"
+  architectures   = ["arm64"]
   timeout         = 30
+  memory_size     = var.lambda_memory_size
+  layers          = var.lambda_layers
+  publish         = true
+
+  # Restore initialized clients from a snapshot instead of cold-starting
+  snap_start {
+    apply_on = "PublishedVersions"
+  }
 
   environment {
     variables = {
-      AUDIO_BUCKET = aws_s3_bucket.audio_bucket.bucket
-      DEBUG_MODE   = "true"
-      LOG_LEVEL    = "DEBUG"
+      AUDIO_BUCKET    = aws_s3_bucket.audio_bucket.bucket
+      DEBUG_MODE      = "true"
+      LOG_LEVEL       = "DEBUG"
+      VOSK_MODEL_PATH = var.vosk_model_path
     }
   }
 
@@ -147,6 +194,13 @@ resource "aws_lambda_function" "voice_processor" {
   ]
 }
 
+# Alias tracking the latest published version (SnapStart only applies to versions)
+resource "aws_lambda_alias" "voice_processor_live" {
+  name             = "live"
+  function_name    = aws_lambda_function.voice_processor.function_name
+  function_version = aws_lambda_function.voice_processor.version
+}
+
 # Package Lambda function
 data "archive_file" "lambda_zip" {
   type        = "zip"
@@ -159,6 +213,9 @@ resource "aws_api_gateway_rest_api" "rover_api" {
   name        = "${var.project_name}-api-${var.environment}"
   description = "API for ESP Rover voice commands"
 
+  # Raw audio uploads reach the Lambda as binary instead of JSON-wrapped base64
+  binary_media_types = ["audio/wav", "audio/*"]
+
   endpoint_configuration {
     types = ["REGIONAL"]
   }
@@ -187,7 +244,7 @@ resource "aws_api_gateway_integration" "lambda_integration" {
 
   integration_http_method = "POST"
   type                   = "AWS_PROXY"
-  uri                    = aws_lambda_function.voice_processor.invoke_arn
+  uri                    = aws_lambda_alias.voice_processor_live.invoke_arn
 }
 
 # Lambda permission for API Gateway
@@ -195,6 +252,7 @@ resource "aws_lambda_permission" "api_gateway_lambda" {
   statement_id  = "AllowExecutionFromAPIGateway"
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.voice_processor.function_name
+  qualifier     = aws_lambda_alias.voice_processor_live.name
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_api_gateway_rest_api.rover_api.execution_arn}/*/*"
 }
@@ -208,6 +266,14 @@ resource "aws_api_gateway_deployment" "rover_api_deployment" {
 
   rest_api_id = aws_api_gateway_rest_api.rover_api.id
 
+  # Redeploy the stage when API settings change, otherwise it keeps the old config
+  triggers = {
+    redeployment = sha1(jsonencode([
+      aws_api_gateway_integration.lambda_integration,
+      aws_api_gateway_rest_api.rover_api.binary_media_types
+    ]))
+  }
+
   lifecycle {
     create_before_destroy = true
   }